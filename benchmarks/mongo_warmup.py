@@ -0,0 +1,72 @@
+"""
+Cold versus warm first-request latency of ``MongoStorage.find``.
+
+Each round builds a fresh storage (a fresh MongoClient, as after a deploy) and times
+its first lookup, once straight away and once after ``warmup()``.
+
+    python benchmarks/mongo_warmup.py --uri mongodb://localhost:27017/
+    python benchmarks/mongo_warmup.py --mongomock
+"""
+import argparse
+import statistics
+import sys
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.joinpath("src")))
+
+import pymongo  # noqa: E402
+
+from services.storage.waitlsit import MongoConfigWaitlist, MongoStorage  # noqa: E402
+
+
+def _first_find_ms(uri: str, db_name: str, *, warm: bool) -> float:
+    mongo_config = MongoConfigWaitlist()
+    mongo_config.uri, mongo_config.db_name = uri, db_name
+    storage = MongoStorage.from_default(mongo_config)
+    try:
+        if warm and not storage.warmup():
+            raise RuntimeError(f"warm-up failed, is MongoDB reachable at {uri}?")
+        start = time.perf_counter()
+        storage.find("bench@example.com")
+        return (time.perf_counter() - start) * 1000
+    finally:
+        storage.close()
+
+
+def _report(label: str, samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(
+        f"{label:<5} median={statistics.median(samples):8.2f} ms"
+        f"  p95={p95:8.2f} ms  max={samples[-1]:8.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--uri", default="mongodb://localhost:27017/")
+    parser.add_argument("--db-name", default="waitlist-bench")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--mongomock", action="store_true", help="run against mongomock")
+    args = parser.parse_args()
+
+    patch = nullcontext()
+    if args.mongomock:
+        import mongomock
+
+        patch = mock.patch("pymongo.MongoClient", mongomock.MongoClient)
+
+    with patch:
+        cold = [_first_find_ms(args.uri, args.db_name, warm=False) for _ in range(args.rounds)]
+        warm = [_first_find_ms(args.uri, args.db_name, warm=True) for _ in range(args.rounds)]
+        pymongo.MongoClient(args.uri).drop_database(args.db_name)
+
+    _report("cold", cold)
+    _report("warm", warm)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,10 +7,13 @@ import secrets
 
 from flask import Flask
 
+from services.middleware import build_profiler
+from .admin import apply_profiler_admin
+from .probes import apply_probes
 from .waitlist_alpha import GoogleOAuth, apply_navigator
 
 
-def _register_google_oauth(backend: Flask, *, test_google_oauth2: bool = True):
+def _register_google_oauth(backend: Flask, *, test_google_oauth2: bool = True) -> GoogleOAuth:
     oauth = GoogleOAuth()
 
     # -- debug --
@@ -26,7 +29,19 @@ def _register_google_oauth(backend: Flask, *, test_google_oauth2: bool = True):
     # -- skip --
     # project.register_service(oauth)
 
+    return oauth
+
 
 def routing(backend: Flask, **kwargs):
     backend.secret_key = secrets.token_hex()
-    _register_google_oauth(backend, **kwargs)
+
+    # -- profiling --
+    profiler = build_profiler()
+    profiler.install(backend)
+    apply_profiler_admin(backend, profiler)
+
+    oauth = _register_google_oauth(backend, **kwargs)
+
+    # -- warm-up --
+    oauth.storage.warmup()
+    apply_probes(backend, oauth.storage)
@@ -0,0 +1,34 @@
+import secrets
+
+import flask
+from flask import Flask, jsonify
+
+from services.middleware import RequestProfiler
+
+
+def apply_profiler_admin(app: Flask, profiler: RequestProfiler, rule: str = "/admin/profiler"):
+    """
+    GET returns the profiler settings, POST a JSON body such as
+    ``{"enabled": true, "sample_rate": 0.05}`` to change them without a restart.
+    Unknown or read-only keys and invalid values are rejected with 400, nothing applied.
+    Requests must carry the `profiler.admin_token` from system.yaml in ``X-Admin-Token``.
+    """
+
+    def _profiler():
+        token = flask.request.headers.get("X-Admin-Token", "").encode()
+        expected = str(profiler.admin_token or "").encode()
+        if not expected or not secrets.compare_digest(token, expected):
+            return jsonify({"result": False, "msg": "Forbidden."}), 403
+
+        if flask.request.method == "POST":
+            settings = flask.request.get_json(silent=True)
+            if not isinstance(settings, dict):
+                return jsonify({"result": False, "msg": "Expected a JSON object."}), 400
+            try:
+                profiler.update(**settings)
+            except ValueError as err:
+                return jsonify({"result": False, "msg": str(err)}), 400
+
+        return jsonify({"result": True, **profiler.state})
+
+    app.add_url_rule(rule, view_func=_profiler, methods=["GET", "POST"])
@@ -0,0 +1,18 @@
+from flask import Flask, jsonify
+
+from services.storage.waitlsit import Storage
+
+
+def apply_probes(app: Flask, storage: Storage):
+    """Liveness and readiness routes for the load balancer"""
+
+    def _healthz():
+        return jsonify({"status": "ok"})
+
+    def _readyz():
+        if storage.is_ready():
+            return jsonify({"status": "ready"})
+        return jsonify({"status": "warming"}), 503
+
+    app.add_url_rule("/healthz", view_func=_healthz, methods=["GET"])
+    app.add_url_rule("/readyz", view_func=_readyz, methods=["GET"])
@@ -9,7 +9,7 @@ from loguru import logger
 
 from services.middleware import notify
 from services.oauth2.google import from_dict_to_credentials, GoogleUser, OAuth2Service
-from services.storage.waitlsit import DefaultWare
+from services.storage.waitlsit import DefaultWare, Storage
 
 
 class GoogleOAuth(OAuth2Service, View):
@@ -17,6 +17,10 @@ class GoogleOAuth(OAuth2Service, View):
         super().__init__()
         self._storage = DefaultWare.from_default()
 
+    @property
+    def storage(self) -> Storage:
+        return self._storage
+
     def _url_for(self, endpoint: str) -> str:
         return flask.url_for(endpoint, _external=True, _scheme=self._scheme)
 
@@ -4,5 +4,6 @@
 # Github     : https://github.com/QIN2DIM
 # Description:
 from .notification import send as notify
+from .profiler import RequestProfiler, from_default as build_profiler
 
-__all__ = ["notify"]
+__all__ = ["notify", "RequestProfiler", "build_profiler"]
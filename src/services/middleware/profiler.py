@@ -0,0 +1,261 @@
+import cProfile
+import math
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import typing
+from collections import Counter
+from contextlib import suppress
+from dataclasses import dataclass, field
+
+import flask
+from loguru import logger
+
+from services.settings import config, project
+
+__all__ = ["RequestProfiler", "from_default"]
+
+# cProfile cannot run in several threads at once on every interpreter, keep one at a time
+_CPROFILE_LOCK = threading.Lock()
+
+# Leaf-first (code, lineno) pairs, only rendered to text when a profile is written
+_Stack = typing.Tuple[typing.Tuple[typing.Any, int], ...]
+
+
+@dataclass
+class _Inflight:
+    endpoint: str
+    start: float
+    cprofile: typing.Optional[cProfile.Profile] = None
+    samples: typing.Counter[_Stack] = field(default_factory=Counter)
+
+
+def _as_bool(key: str, value) -> bool:
+    if not isinstance(value, bool):
+        raise ValueError(f"{key} must be a boolean")
+    return value
+
+
+def _as_number(key: str, value, lower: float, upper: float = math.inf) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{key} must be a number")
+    if not math.isfinite(value) or not lower <= value <= upper:
+        raise ValueError(f"{key} must be within [{lower}, {upper}]")
+    return value
+
+
+def _as_paths(key: str, value) -> typing.List[str]:
+    if not isinstance(value, list) or not all(isinstance(p, str) for p in value):
+        raise ValueError(f"{key} must be a list of paths")
+    return value
+
+
+def _as_token(key: str, value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool) or not isinstance(value, (str, int)):
+        raise ValueError(f"{key} must be a string")
+    return str(value)
+
+
+_Validators = typing.Dict[str, typing.Callable[[str, typing.Any], typing.Any]]
+
+# Settings that `/admin/profiler` may change at runtime
+_RUNTIME_VALIDATORS: _Validators = {
+    "enabled": _as_bool,
+    "sample_rate": lambda k, v: float(_as_number(k, v, 0.0, 1.0)),
+    "slow_threshold_ms": lambda k, v: int(_as_number(k, v, 0, 3_600_000)),
+    "sample_interval_ms": lambda k, v: int(_as_number(k, v, 1, 60_000)),
+}
+# Settings accepted from the `profiler` section of system.yaml
+_BOOT_VALIDATORS: _Validators = {
+    **_RUNTIME_VALIDATORS,
+    "max_profiles": lambda k, v: int(_as_number(k, v, 1, 100_000)),
+    "exclude_paths": _as_paths,
+    "admin_token": _as_token,
+}
+
+
+def _validate(settings: typing.Dict[str, typing.Any], validators: _Validators):
+    """Validate every setting before any is applied, unknown keys included"""
+    unknown = sorted(set(settings) - set(validators))
+    if unknown:
+        raise ValueError(f"Unknown or read-only profiler settings: {', '.join(unknown)}")
+    return {k: validators[k](k, v) for k, v in settings.items()}
+
+
+@dataclass
+class RequestProfiler:
+    enabled: typing.Optional[bool] = False
+    # Fraction of requests that run under cProfile, dumped as `.pstats`
+    sample_rate: typing.Optional[float] = 0.01
+    # While enabled, every in-flight request has its stack sampled so that slow ones are
+    # profiled from their first millisecond; requests slower than this keep the samples
+    # and are dumped as `.folded` (speedscope), faster ones drop them. A tick only records
+    # (code, lineno) pairs, text rendering and disk writes happen on the writer thread
+    slow_threshold_ms: typing.Optional[int] = 1000
+    sample_interval_ms: typing.Optional[int] = 10
+    # Oldest profiles are deleted beyond this count
+    max_profiles: typing.Optional[int] = 200
+    exclude_paths: typing.Optional[typing.List[str]] = field(
+        default_factory=lambda: ["/healthz", "/readyz", "/admin/profiler"]
+    )
+    admin_token: typing.Optional[str] = field(default="", repr=False)
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._inflight: typing.Dict[int, _Inflight] = {}
+        self._sampler: typing.Optional[threading.Thread] = None
+        self._pending: queue.Queue = queue.Queue()
+        self._writer: typing.Optional[threading.Thread] = None
+
+    @property
+    def state(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "slow_threshold_ms": self.slow_threshold_ms,
+            "sample_interval_ms": self.sample_interval_ms,
+        }
+
+    def update(self, **settings) -> typing.Dict[str, typing.Any]:
+        """
+        Apply runtime settings.
+
+        :raise ValueError: If any key is unknown or read-only, or any value is invalid,
+            in which case nothing is applied
+        """
+        for k, v in _validate(settings, _RUNTIME_VALIDATORS).items():
+            setattr(self, k, v)
+        logger.info("Profiler settings updated", **self.state)
+        return self.state
+
+    def install(self, app: flask.Flask):
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+        self._writer = threading.Thread(target=self._write_forever, daemon=True)
+        self._writer.start()
+
+    def flush(self):
+        """Block until every captured profile has been written"""
+        self._pending.join()
+
+    def _before_request(self):
+        if not self.enabled or flask.request.path in self.exclude_paths:
+            return
+        record = _Inflight(endpoint=flask.request.endpoint or "unknown", start=time.perf_counter())
+        if random.random() < self.sample_rate and _CPROFILE_LOCK.acquire(blocking=False):
+            record.cprofile = cProfile.Profile()
+            record.cprofile.enable()
+        with self._lock:
+            self._inflight[threading.get_ident()] = record
+            if self._sampler is None or not self._sampler.is_alive():
+                self._sampler = threading.Thread(target=self._sample_forever, daemon=True)
+                self._sampler.start()
+
+    def _teardown_request(self, exc=None):
+        with self._lock:
+            record = self._inflight.pop(threading.get_ident(), None)
+        if record is None:
+            return
+        elapsed_ms = (time.perf_counter() - record.start) * 1000
+        if record.cprofile is not None:
+            record.cprofile.disable()
+            _CPROFILE_LOCK.release()
+
+        is_slow = elapsed_ms >= self.slow_threshold_ms
+        if record.cprofile is not None or is_slow:
+            # Disk writes stay off the request path
+            self._pending.put((record, elapsed_ms, is_slow))
+
+    def _write_forever(self):
+        while True:
+            record, elapsed_ms, is_slow = self._pending.get()
+            try:
+                self._write(record, elapsed_ms, is_slow)
+                self._prune()
+            finally:
+                self._pending.task_done()
+
+    @logger.catch
+    def _write(self, record: _Inflight, elapsed_ms: float, is_slow: bool):
+        stem = f"{int(time.time() * 1000)}-{record.endpoint}-{int(elapsed_ms)}ms"
+        written = []
+        try:
+            if record.cprofile is not None:
+                path = project.profiles.joinpath(f"{stem}.pstats")
+                record.cprofile.dump_stats(path)
+                written.append(path.name)
+            # Without cProfile output, a slow request the sampler never caught still gets a
+            # single-frame record
+            if is_slow and (record.samples or record.cprofile is None):
+                path = project.profiles.joinpath(f"{stem}.folded")
+                self._dump_folded(record, path)
+                written.append(path.name)
+        except OSError as err:
+            logger.error("Failed to write request profile", err=err, endpoint=record.endpoint)
+            return
+
+        if is_slow:
+            logger.warning(
+                "Slow request captured",
+                endpoint=record.endpoint,
+                elapsed_ms=int(elapsed_ms),
+                files=written,
+            )
+
+    def _prune(self):
+        with suppress(OSError):
+            profiles = sorted(
+                (p for p in project.profiles.iterdir() if p.suffix in (".pstats", ".folded")),
+                key=lambda p: p.stat().st_mtime,
+            )
+            for path in profiles[: max(len(profiles) - self.max_profiles, 0)]:
+                path.unlink(missing_ok=True)
+
+    def _sample_forever(self):
+        while self.enabled:
+            time.sleep(self.sample_interval_ms / 1000)
+            with self._lock:
+                inflight = dict(self._inflight)
+            if not inflight:
+                continue
+            frames = sys._current_frames()
+            stacks = {tid: _capture(frames[tid]) for tid in inflight if tid in frames}
+            with self._lock:
+                # Skip requests that finished while their stacks were being folded
+                for tid, stack in stacks.items():
+                    if self._inflight.get(tid) is inflight[tid]:
+                        inflight[tid].samples[stack] += 1
+
+    @staticmethod
+    def _dump_folded(record: _Inflight, path):
+        lines = [f"{_fold(stack)} {count}" for stack, count in record.samples.most_common()]
+        path.write_text("\n".join(lines or [f"{record.endpoint} 1"]) + "\n", encoding="utf8")
+
+
+def _capture(frame) -> _Stack:
+    stack = []
+    while frame is not None:
+        stack.append((frame.f_code, frame.f_lineno))
+        frame = frame.f_back
+    return tuple(stack)
+
+
+def _fold(stack: _Stack) -> str:
+    """Render a stack root-first in Brendan Gregg's collapsed format"""
+    return ";".join(
+        f"{code.co_name} ({os.path.basename(code.co_filename)}:{lineno})"
+        for code, lineno in reversed(stack)
+    )
+
+
+def from_default() -> RequestProfiler:
+    """
+    :raise ValueError: If the `profiler` section of system.yaml is invalid, so a bad
+        config fails the boot instead of every request
+    """
+    return RequestProfiler(**_validate(config.profiler or {}, _BOOT_VALIDATORS))
@@ -25,11 +25,12 @@ class Project:
     config_google_oauth_client_secret = secret.joinpath("client_secret_google.json")
 
     logs = root_point.joinpath("logs")
+    profiles = logs.joinpath("profiles")
 
     _pending_events = None
 
     def __post_init__(self):
-        for hook in [self.secret]:
+        for hook in [self.secret, self.profiles]:
             os.makedirs(hook, exist_ok=True)
 
     def diagnose(self):
@@ -77,6 +78,29 @@ class Project:
             },
             "default_database": "memory",
             "mongo_waitlist_uri": "mongodb://localhost:27017/",
+            "mongo_waitlist_pool": {
+                # Size the pool to the number of worker threads
+                "max_pool_size": 32,
+                "min_pool_size": 4,
+                "max_idle_time_ms": 300000,
+                "connect_timeout_ms": 5000,
+                "server_selection_timeout_ms": 5000,
+                "socket_timeout_ms": 10000,
+                "wait_queue_timeout_ms": 2000,
+                "read_concern": "local",
+                "write_concern": 1,
+                "warmup_timeout_ms": 2000,
+                "warmup_retry_interval_ms": 5000,
+            },
+            "profiler": {
+                "enabled": False,
+                "sample_rate": 0.01,
+                "slow_threshold_ms": 1000,
+                "sample_interval_ms": 10,
+                "max_profiles": 200,
+                "exclude_paths": ["/healthz", "/readyz", "/admin/profiler"],
+                "admin_token": "",  # Required by `/admin/profiler`, empty to disable the route
+            },
         }
 
     def register_service(self, service):
@@ -90,6 +114,8 @@ class Config:
     apprise: Dict[str, Any] = field(default_factory=dict)
     oauth2: Dict[str, Any] = field(default_factory=dict)
     mongo_waitlist_uri: str = ""
+    mongo_waitlist_pool: Dict[str, Any] = field(default_factory=dict)
+    profiler: Dict[str, Any] = field(default_factory=dict)
     default_database: Literal["memory", "mongo"] = "memory"
 
     @classmethod
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from typing import Callable, Dict, Tuple
+
+__all__ = ["canonicalize"]
+
+# Providers that ignore dots in the local part and deliver `user+tag` to `user`
+_GMAIL_DOMAINS = {"gmail.com", "googlemail.com"}
+# Providers that only support `+tag` sub-addressing
+_PLUS_TAG_DOMAINS = {
+    "outlook.com",
+    "hotmail.com",
+    "live.com",
+    "msn.com",
+    "icloud.com",
+    "me.com",
+    "mac.com",
+    "protonmail.com",
+    "proton.me",
+    "fastmail.com",
+}
+
+
+def _strip_tag(local: str, sep: str = "+") -> str:
+    return local.split(sep, 1)[0]
+
+
+def _gmail(local: str, domain: str) -> Tuple[str, str]:
+    return _strip_tag(local).replace(".", ""), "gmail.com"
+
+
+def _plus_tag(local: str, domain: str) -> Tuple[str, str]:
+    return _strip_tag(local), domain
+
+
+def _yahoo(local: str, domain: str) -> Tuple[str, str]:
+    # Yahoo disposable addresses take the form `base-keyword@yahoo.com`
+    return _strip_tag(local, "-"), domain
+
+
+_RULES: Dict[str, Callable[[str, str], Tuple[str, str]]] = {
+    **{d: _gmail for d in _GMAIL_DOMAINS},
+    **{d: _plus_tag for d in _PLUS_TAG_DOMAINS},
+    "yahoo.com": _yahoo,
+}
+
+
+def canonicalize(email: str | None) -> str:
+    """
+    Map every alias of a mailbox to the same key.
+
+        >>> canonicalize("John.Doe+promo@GoogleMail.com")
+        'johndoe@gmail.com'
+
+    Unknown providers, and local parts that a rule would reduce to nothing,
+    are only case-folded, so distinct mailboxes never collide.
+
+    :param email: Raw address as returned by the OAuth provider
+    :return: Canonical key, or an empty string if ``email`` is not an address
+    """
+    if not email:
+        return ""
+    email = email.strip().lower()
+    local, sep, domain = email.rpartition("@")
+    if not sep or not local or not domain:
+        return email
+    domain = domain.rstrip(".")
+    if rule := _RULES.get(domain):
+        canonical_local, canonical_domain = rule(local, domain)
+        # `+tag@gmail.com` or `...@gmail.com` would otherwise all collapse to `@gmail.com`
+        if canonical_local:
+            return f"{canonical_local}@{canonical_domain}"
+    return f"{local}@{domain}"
@@ -1,31 +1,75 @@
 from __future__ import annotations
 
+import threading
+import time
 from abc import ABC, abstractmethod
 from contextlib import suppress
 from dataclasses import dataclass
 from dataclasses import field, asdict
 from datetime import datetime
 from pathlib import Path
-from typing import Set, Optional
+from typing import Any, Dict, Iterator, Set, Optional, Union
 
 import pymongo
+from loguru import logger
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
 
 from services.oauth2.google import UserInfo
 from services.settings import project, config
+from services.storage.canonical import canonicalize
 
 __all__ = ["MongoStorage", "DefaultWare", "MemoStorage"]
 
+# `mongo_waitlist_pool` key -> MongoClient keyword
+_POOL_OPTIONS = {
+    "max_pool_size": "maxPoolSize",
+    "min_pool_size": "minPoolSize",
+    "max_idle_time_ms": "maxIdleTimeMS",
+    "connect_timeout_ms": "connectTimeoutMS",
+    "server_selection_timeout_ms": "serverSelectionTimeoutMS",
+    "socket_timeout_ms": "socketTimeoutMS",
+    "wait_queue_timeout_ms": "waitQueueTimeoutMS",
+    "read_concern": "readConcernLevel",
+    "write_concern": "w",
+}
+
 
 @dataclass
 class MongoConfigWaitlist:
     uri: Optional[str] = "mongodb://localhost:27017/"
     db_name: Optional[str] = "waitlist-alpha"
 
+    # Connection pool, see `mongo_waitlist_pool` in system.yaml
+    max_pool_size: Optional[int] = 100
+    min_pool_size: Optional[int] = 0
+    max_idle_time_ms: Optional[int] = None
+    connect_timeout_ms: Optional[int] = 20000
+    server_selection_timeout_ms: Optional[int] = 30000
+    socket_timeout_ms: Optional[int] = None
+    wait_queue_timeout_ms: Optional[int] = None
+    read_concern: Optional[str] = None
+    write_concern: Optional[Union[int, str]] = None
+
+    # Deadline of one whole warm-up attempt (ping, index checks); failed attempts retry in
+    # the background, so a dead or stalled MongoDB holds the boot for one deadline at most
+    warmup_timeout_ms: Optional[int] = 2000
+    warmup_retry_interval_ms: Optional[int] = 5000
+
     def __post_init__(self):
         with suppress(KeyError):
             mongo_waitlist_uri = config.mongo_waitlist_uri
             if mongo_waitlist_uri:
                 self.uri = mongo_waitlist_uri
+        tunable = {*_POOL_OPTIONS, "warmup_timeout_ms", "warmup_retry_interval_ms"}
+        for k, v in (config.mongo_waitlist_pool or {}).items():
+            if k in tunable:
+                setattr(self, k, v)
+
+    @property
+    def client_options(self) -> Dict[str, Any]:
+        options = {kw: getattr(self, k) for k, kw in _POOL_OPTIONS.items()}
+        return {k: v for k, v in options.items() if v is not None}
 
 
 class Storage(ABC):
@@ -41,15 +85,29 @@ class Storage(ABC):
     def insert(self, *args, **kwargs):
         ...
 
+    @abstractmethod
+    def rebuild_canonical_index(self, *args, **kwargs) -> int:
+        """Recompute the canonical key of every stored email"""
+
     def flush_model(self, data_model: UserInfo):
         self._data_model = data_model
 
+    def warmup(self) -> bool:
+        """Open connections and check indexes before the first request arrives"""
+        return True
+
+    def is_ready(self) -> bool:
+        """Must not block, it backs the load balancer's readiness probe"""
+        return True
+
 
 @dataclass
 class MemoStorage(Storage):
     sink_path: Path = None
 
     _cached_emails: Set[str] | None = field(default_factory=set)
+    # canonical key -> first raw email stored under it
+    _canonical_index: Dict[str, str] | None = field(default_factory=dict)
 
     @classmethod
     def from_default(cls):
@@ -60,47 +118,114 @@ class MemoStorage(Storage):
         else:
             with open(mo.sink_path, "r", encoding="utf8") as file:
                 mo._cached_emails = {line.strip() for line in file if line.strip()}
+        mo.rebuild_canonical_index()
         return mo
 
     def _refresh_localdb(self):
         self.sink_path.write_text("\n".join(self._cached_emails), encoding="utf8")
 
     def find(self, email, *args, **kwargs) -> bool | None:
-        if email and email in self._cached_emails:
+        if email and canonicalize(email) in self._canonical_index:
             return True
         return False
 
     def insert(self, email, *args, **kwargs):
         self._cached_emails.add(email)
+        self._canonical_index.setdefault(canonicalize(email), email)
         self._refresh_localdb()
 
+    def rebuild_canonical_index(self, *args, **kwargs) -> int:
+        self._canonical_index = {}
+        for email in sorted(self._cached_emails):
+            self._canonical_index.setdefault(canonicalize(email), email)
+        return len(self._canonical_index)
+
 
 @dataclass
 class MongoStorage(Storage):
     _COLLECTION_USERS = "users"
+    _FIELD_CANONICAL = "email_canonical"
 
     _cursor = None
     _waitlist = None
+    _warmed = False
+    _retrying = None
 
     @classmethod
-    def from_default(cls):
+    def from_default(cls, mongo_config: MongoConfigWaitlist | None = None):
         """Only for Google OAuth response"""
         mo = cls()
-        mo._config = MongoConfigWaitlist()
-        mo._client = pymongo.MongoClient(mo._config.uri)
+        mo._config = mongo_config or MongoConfigWaitlist()
+        mo._client = pymongo.MongoClient(mo._config.uri, **mo._config.client_options)
         mo._waitlist = mo._client.get_database(mo._config.db_name)
         mo._cursor = mo._waitlist.get_collection(mo._COLLECTION_USERS)
         return mo
 
+    def close(self):
+        self._client.close()
+
+    def _try_warmup(self) -> bool:
+        try:
+            with pymongo.timeout(self._config.warmup_timeout_ms / 1000):
+                # The ping pays for server selection and the first connection; pymongo's
+                # background task then tops the pool up to `min_pool_size` on its own
+                self._client.admin.command("ping")
+                self._cursor.create_index("email")
+                self._cursor.create_index(self._FIELD_CANONICAL)
+                # `find` falls back to the raw email for these, but they should be migrated
+                stale = self._cursor.find_one(
+                    {self._FIELD_CANONICAL: {"$exists": False}}, {"_id": 1}
+                )
+        except PyMongoError as err:
+            logger.warning("MongoDB warm-up failed", err=err, db=self._config.db_name)
+            return False
+        if stale:
+            logger.warning(
+                "Users without a canonical email key, run rebuild_canonical_index()",
+                db=self._config.db_name,
+            )
+        self._warmed = True
+        logger.success(
+            "MongoDB connection pool warmed",
+            min_pool_size=self._config.min_pool_size,
+            db=self._config.db_name,
+        )
+        return True
+
+    def _retry_warmup_forever(self):
+        interval = self._config.warmup_retry_interval_ms / 1000
+        while not self._try_warmup():
+            time.sleep(interval)
+
+    def warmup(self) -> bool:
+        if self._warmed or self._try_warmup():
+            return True
+        # A worker that booted while MongoDB was down keeps retrying off the request path
+        if self._retrying is None or not self._retrying.is_alive():
+            self._retrying = threading.Thread(target=self._retry_warmup_forever, daemon=True)
+            self._retrying.start()
+        return False
+
+    def is_ready(self) -> bool:
+        return self._warmed
+
     def find(self, email: str | None = None, *args, **kwargs) -> bool | None:
         email = email or self._data_model.email
-        return self._cursor.find_one(filter={"email": email}, *args, **kwargs)
+        # The raw email still matches documents that have not been backfilled yet
+        query = {"$or": [{self._FIELD_CANONICAL: canonicalize(email)}, {"email": email}]}
+        return self._cursor.find_one(filter=query, *args, **kwargs)
 
     def insert(self, *args, **kwargs) -> bool | None:
         # make dictionary from data model
         pending_data = asdict(self._data_model)
         # Date is automatically redirected to the UTC timezone
-        pending_data.update({"_date": datetime.now(), "_accessed": False})
+        pending_data.update(
+            {
+                "_date": datetime.now(),
+                "_accessed": False,
+                self._FIELD_CANONICAL: canonicalize(self._data_model.email),
+            }
+        )
 
         result = self._cursor.insert_one(pending_data)
         try:
@@ -108,6 +233,29 @@ class MongoStorage(Storage):
         except (AttributeError, TypeError):
             return None
 
+    def _iter_stale_canonical(self, batch_size: int) -> Iterator[UpdateOne]:
+        projection = {"email": True, self._FIELD_CANONICAL: True}
+        for doc in self._cursor.find({}, projection=projection, batch_size=batch_size):
+            key = canonicalize(doc.get("email"))
+            if doc.get(self._FIELD_CANONICAL) != key:
+                yield UpdateOne({"_id": doc["_id"]}, {"$set": {self._FIELD_CANONICAL: key}})
+
+    def rebuild_canonical_index(self, batch_size: int = 1000, *args, **kwargs) -> int:
+        """Stream the collection and backfill canonical keys in bulk batches"""
+        updated = 0
+        pending = []
+        for op in self._iter_stale_canonical(batch_size):
+            pending.append(op)
+            if len(pending) >= batch_size:
+                updated += self._cursor.bulk_write(pending, ordered=False).modified_count
+                pending = []
+        if pending:
+            updated += self._cursor.bulk_write(pending, ordered=False).modified_count
+        self._cursor.create_index("email")
+        self._cursor.create_index(self._FIELD_CANONICAL)
+        logger.success("Rebuilt canonical email index", updated=updated)
+        return updated
+
 
 _dw = {
     "memory": MemoStorage,
@@ -0,0 +1,36 @@
+import importlib.util
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+_SRC = Path(__file__).resolve().parent.parent.joinpath("src")
+sys.path.insert(0, str(_SRC))
+
+_SANDBOX = Path(tempfile.mkdtemp(prefix="waitlist-tests-"))
+
+
+def _load_sandboxed_settings():
+    """
+    Import services.settings as if the project lived in a temp directory, so its
+    system.yaml, database/ and logs/ never touch the source tree.
+    """
+    sandbox_src = _SANDBOX.joinpath("src")
+    sandbox_src.joinpath("services").mkdir(parents=True)
+    sandbox_src.joinpath("system.yaml").write_text("{}\n", encoding="utf8")
+
+    spec = importlib.util.spec_from_file_location(
+        "services.settings", _SRC.joinpath("services", "settings.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    # Project derives every path from `__file__`
+    module.__file__ = str(sandbox_src.joinpath("services", "settings.py"))
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+
+
+_load_sandboxed_settings()
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_SANDBOX, ignore_errors=True)
@@ -0,0 +1,45 @@
+import pytest
+
+from services.storage.canonical import canonicalize
+
+
+@pytest.mark.parametrize(
+    "email, expected",
+    [
+        # Gmail ignores dots and `+tag`, googlemail.com is the same mailbox
+        ("John.Doe+promo@gmail.com", "johndoe@gmail.com"),
+        ("johndoe@gmail.com", "johndoe@gmail.com"),
+        ("j.o.h.n.doe@GoogleMail.com", "johndoe@gmail.com"),
+        # `+tag` only, dots are significant
+        ("A.B+news@Outlook.com", "a.b@outlook.com"),
+        ("user+x@icloud.com", "user@icloud.com"),
+        # Yahoo disposable addresses
+        ("base-shop@yahoo.com", "base@yahoo.com"),
+        # Unknown providers are only case-folded
+        ("First.Last+tag@Example.org", "first.last+tag@example.org"),
+        # Trailing dot in the domain still hits the provider rule
+        ("john.doe@gmail.com.", "johndoe@gmail.com"),
+        ("  John@Example.org ", "john@example.org"),
+    ],
+)
+def test_provider_rules(email, expected):
+    assert canonicalize(email) == expected
+
+
+@pytest.mark.parametrize(
+    "email", ["+a@gmail.com", "+b@gmail.com", "...@gmail.com", "-x@yahoo.com", "+y@outlook.com"]
+)
+def test_empty_local_part_falls_back_to_case_folded_address(email):
+    assert canonicalize(email) == email.lower()
+
+
+def test_degenerate_addresses_do_not_collide():
+    keys = {canonicalize(e) for e in ["+a@gmail.com", "+b@gmail.com", "...@gmail.com"]}
+    assert len(keys) == 3
+
+
+@pytest.mark.parametrize(
+    "email, expected", [(None, ""), ("", ""), ("not-an-email", "not-an-email")]
+)
+def test_non_addresses(email, expected):
+    assert canonicalize(email) == expected
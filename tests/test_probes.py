@@ -0,0 +1,129 @@
+import time
+from unittest import mock
+
+import flask
+import pytest
+from pymongo.errors import ServerSelectionTimeoutError
+
+from apis.probes import apply_probes
+from services.settings import config
+from services.storage.waitlsit import MemoStorage, MongoConfigWaitlist, MongoStorage
+
+mongomock = pytest.importorskip("mongomock")
+
+
+def test_pool_settings_map_to_client_options(monkeypatch):
+    monkeypatch.setattr(config, "mongo_waitlist_uri", "mongodb://db.internal:27017/")
+    monkeypatch.setattr(
+        config,
+        "mongo_waitlist_pool",
+        {
+            "max_pool_size": 16,
+            "min_pool_size": 4,
+            "max_idle_time_ms": 60000,
+            "connect_timeout_ms": 1000,
+            "server_selection_timeout_ms": 2000,
+            "socket_timeout_ms": 3000,
+            "wait_queue_timeout_ms": 500,
+            "read_concern": "majority",
+            "write_concern": "majority",
+            "warmup_timeout_ms": 750,
+        },
+    )
+
+    mongo_config = MongoConfigWaitlist()
+
+    assert mongo_config.client_options == {
+        "maxPoolSize": 16,
+        "minPoolSize": 4,
+        "maxIdleTimeMS": 60000,
+        "connectTimeoutMS": 1000,
+        "serverSelectionTimeoutMS": 2000,
+        "socketTimeoutMS": 3000,
+        "waitQueueTimeoutMS": 500,
+        "readConcernLevel": "majority",
+        "w": "majority",
+    }
+    assert mongo_config.warmup_timeout_ms == 750
+
+
+def test_unset_pool_settings_are_left_to_pymongo(monkeypatch):
+    monkeypatch.setattr(config, "mongo_waitlist_pool", {})
+
+    options = MongoConfigWaitlist().client_options
+
+    assert "socketTimeoutMS" not in options and "w" not in options
+
+
+def test_pool_section_cannot_override_uri_or_db_name(monkeypatch):
+    monkeypatch.setattr(config, "mongo_waitlist_uri", "mongodb://db.internal:27017/")
+    monkeypatch.setattr(
+        config, "mongo_waitlist_pool", {"uri": "mongodb://elsewhere/", "db_name": "other"}
+    )
+
+    mongo_config = MongoConfigWaitlist()
+
+    assert mongo_config.uri == "mongodb://db.internal:27017/"
+    assert mongo_config.db_name == "waitlist-alpha"
+
+
+@pytest.fixture
+def mongo():
+    mongo_config = MongoConfigWaitlist()
+    mongo_config.db_name = "waitlist-probes"
+    mongo_config.warmup_retry_interval_ms = 10
+    with mock.patch("pymongo.MongoClient", mongomock.MongoClient):
+        storage = MongoStorage.from_default(mongo_config)
+    yield storage
+    storage.close()
+
+
+def _client(storage):
+    app = flask.Flask(__name__)
+    apply_probes(app, storage)
+    return app.test_client()
+
+
+def test_readyz_turns_ready_once_background_warmup_succeeds(mongo, monkeypatch):
+    command = mongomock.database.Database.command
+    calls = []
+
+    def flaky_command(self, *args, **kwargs):
+        calls.append(args)
+        if len(calls) <= 3:
+            raise ServerSelectionTimeoutError("MongoDB is still starting")
+        return command(self, *args, **kwargs)
+
+    monkeypatch.setattr(mongomock.database.Database, "command", flaky_command)
+    client = _client(mongo)
+
+    assert not mongo.warmup()
+    assert client.get("/healthz").status_code == 200
+    assert client.get("/readyz").status_code == 503
+
+    deadline = time.monotonic() + 5
+    while not mongo.is_ready() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert len(calls) > 3
+    assert client.get("/readyz").status_code == 200
+
+
+def test_readyz_does_not_block_while_warming(mongo, monkeypatch):
+    monkeypatch.setattr(
+        mongomock.database.Database,
+        "command",
+        mock.Mock(side_effect=ServerSelectionTimeoutError("down")),
+    )
+    client = _client(mongo)
+    mongo.warmup()
+
+    start = time.perf_counter()
+    assert client.get("/readyz").status_code == 503
+    assert time.perf_counter() - start < 0.5
+
+
+def test_memo_storage_is_always_ready(tmp_path):
+    client = _client(MemoStorage(sink_path=tmp_path.joinpath("waitlist.txt")))
+
+    assert client.get("/readyz").status_code == 200
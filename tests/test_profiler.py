@@ -0,0 +1,184 @@
+import time
+
+import flask
+import pytest
+
+from apis.admin import apply_profiler_admin
+from services.middleware import RequestProfiler, build_profiler
+from services.settings import config, project
+
+_TOKEN = "s3cret"
+
+
+@pytest.fixture
+def profiles(tmp_path, monkeypatch):
+    monkeypatch.setattr(project, "profiles", tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def profiler():
+    profiler = RequestProfiler(
+        enabled=True,
+        sample_rate=1.0,
+        slow_threshold_ms=200,
+        sample_interval_ms=10,
+        admin_token=_TOKEN,
+    )
+    yield profiler
+    # Lets the sampler thread exit
+    profiler.enabled = False
+
+
+@pytest.fixture
+def client(profiler):
+    app = flask.Flask(__name__)
+    profiler.install(app)
+    apply_profiler_admin(app, profiler)
+
+    @app.route("/slow")
+    def slow():
+        time.sleep(0.4)
+        return "ok"
+
+    @app.route("/fast")
+    def fast():
+        return "ok"
+
+    return app.test_client()
+
+
+def _get(client, profiler, path, **kwargs):
+    resp = client.get(path, **kwargs)
+    profiler.flush()
+    return resp
+
+
+def _emitted(profiles, suffix):
+    return sorted(profiles.glob(f"*{suffix}"))
+
+
+def test_slow_handler_emits_pstats_and_folded(profiles, profiler, client):
+    assert _get(client, profiler, "/slow").status_code == 200
+
+    assert len(_emitted(profiles, ".pstats")) == 1
+    (folded,) = _emitted(profiles, ".folded")
+    lines = folded.read_text(encoding="utf8").splitlines()
+    assert any("slow (test_profiler.py" in line for line in lines)
+    # Sampling starts with the request, not once it crosses the threshold
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) > 25
+
+
+def test_slow_handler_without_cprofile_still_emits_folded(profiles, profiler, client):
+    profiler.sample_rate = 0.0
+    _get(client, profiler, "/slow")
+
+    assert not _emitted(profiles, ".pstats")
+    assert len(_emitted(profiles, ".folded")) == 1
+
+
+def test_fast_unsampled_request_emits_nothing(profiles, profiler, client):
+    profiler.sample_rate = 0.0
+    _get(client, profiler, "/fast")
+
+    assert not list(profiles.iterdir())
+
+
+def test_disabled_profiler_emits_nothing(profiles, profiler, client):
+    profiler.enabled = False
+    _get(client, profiler, "/slow")
+
+    assert not list(profiles.iterdir())
+
+
+def test_excluded_paths_are_not_profiled(profiles, profiler, client):
+    _get(client, profiler, "/admin/profiler", headers={"X-Admin-Token": _TOKEN})
+
+    assert not list(profiles.iterdir())
+
+
+def test_profiles_are_pruned(profiles, profiler, client):
+    profiler.max_profiles = 2
+    for _ in range(4):
+        _get(client, profiler, "/fast")
+
+    assert len(_emitted(profiles, ".pstats")) == 2
+
+
+def test_admin_token_repr_is_hidden(profiler):
+    assert _TOKEN not in repr(profiler)
+
+
+@pytest.mark.parametrize("token", ["", "wrong", "ünïcode"])
+def test_admin_rejects_bad_tokens(client, token):
+    assert client.get("/admin/profiler", headers={"X-Admin-Token": token}).status_code == 403
+
+
+def test_admin_accepts_non_string_configured_token(profiler, client):
+    profiler.admin_token = 1234
+    assert client.get("/admin/profiler", headers={"X-Admin-Token": "1234"}).status_code == 200
+
+
+def test_admin_toggles_profiler_at_runtime(profiles, profiler, client):
+    resp = client.post(
+        "/admin/profiler", headers={"X-Admin-Token": _TOKEN}, json={"enabled": False}
+    )
+    assert resp.status_code == 200 and resp.json["enabled"] is False
+
+    _get(client, profiler, "/slow")
+    assert not list(profiles.iterdir())
+
+
+@pytest.mark.parametrize(
+    "settings",
+    [
+        {"sample_rate": 0.5, "slow_threshold_ms": 1e999},
+        {"sample_rate": 0.5, "enabled": "false"},
+        {"sample_rate": 0.5, "sample_interval_ms": "10"},
+        {"sample_rate": 2},
+        {"sample_rate": 0.5, "enable": True},
+        {"sample_rate": 0.5, "max_profiles": 10},
+        {"sample_rate": 0.5, "admin_token": "other"},
+    ],
+)
+def test_admin_rejects_invalid_updates_atomically(profiler, client, settings):
+    before = dict(profiler.state)
+    resp = client.post("/admin/profiler", headers={"X-Admin-Token": _TOKEN}, json=settings)
+
+    assert resp.status_code == 400
+    assert profiler.state == before
+
+
+def test_admin_rejects_non_object_body(client):
+    resp = client.post("/admin/profiler", headers={"X-Admin-Token": _TOKEN}, json=[1])
+    assert resp.status_code == 400
+
+
+def test_from_default_applies_yaml(monkeypatch):
+    monkeypatch.setattr(
+        config,
+        "profiler",
+        {"enabled": True, "sample_rate": 0.05, "exclude_paths": ["/healthz"], "admin_token": 42},
+    )
+
+    profiler = build_profiler()
+
+    assert profiler.enabled is True and profiler.sample_rate == 0.05
+    assert profiler.exclude_paths == ["/healthz"] and profiler.admin_token == "42"
+
+
+@pytest.mark.parametrize(
+    "settings",
+    [
+        {"enabled": True, "sample_rate": "0.05"},
+        {"exclude_paths": None},
+        {"enabled": "yes"},
+        {"max_profiles": 0},
+        {"sampel_rate": 0.05},
+    ],
+)
+def test_from_default_rejects_invalid_yaml(monkeypatch, settings):
+    monkeypatch.setattr(config, "profiler", settings)
+
+    with pytest.raises(ValueError):
+        build_profiler()
@@ -0,0 +1,81 @@
+from unittest import mock
+
+import pytest
+
+from services.settings import project
+from services.storage.waitlsit import MemoStorage, MongoConfigWaitlist, MongoStorage
+
+
+@pytest.fixture
+def memo(tmp_path, monkeypatch):
+    monkeypatch.setattr(project, "waitlist_local_cache", tmp_path.joinpath("waitlist.txt"))
+    return MemoStorage.from_default()
+
+
+def test_memo_dedups_aliases(memo):
+    memo.insert("John.Doe+promo@gmail.com")
+
+    assert memo.find("johndoe@gmail.com")
+    assert memo.find("JOHN.DOE@googlemail.com")
+    assert not memo.find("jane@gmail.com")
+
+
+def test_memo_keeps_raw_email_on_disk(memo):
+    memo.insert("John.Doe+promo@gmail.com")
+
+    assert memo.sink_path.read_text(encoding="utf8") == "John.Doe+promo@gmail.com"
+
+
+def test_memo_from_default_indexes_existing_file(tmp_path, monkeypatch):
+    sink = tmp_path.joinpath("waitlist.txt")
+    sink.write_text("John.Doe@gmail.com\nj.o.h.n.doe+x@gmail.com\nbob@example.org\n")
+    monkeypatch.setattr(project, "waitlist_local_cache", sink)
+
+    memo = MemoStorage.from_default()
+
+    assert memo.find("johndoe@gmail.com")
+    assert memo.find("BOB@example.org")
+    # Two raw aliases, one canonical key
+    assert memo.rebuild_canonical_index() == 2
+
+
+def test_memo_rebuild_canonical_index(memo):
+    memo._cached_emails |= {"a.b@gmail.com", "ab+x@gmail.com"}
+    assert not memo.find("ab@gmail.com")
+
+    assert memo.rebuild_canonical_index() == 1
+    assert memo.find("ab@gmail.com")
+
+
+@pytest.fixture
+def mongo():
+    mongomock = pytest.importorskip("mongomock")
+    mongo_config = MongoConfigWaitlist()
+    mongo_config.db_name = "waitlist-test"
+    with mock.patch("pymongo.MongoClient", mongomock.MongoClient):
+        storage = MongoStorage.from_default(mongo_config)
+    yield storage
+    storage._client.drop_database(mongo_config.db_name)
+    storage.close()
+
+
+def test_mongo_find_matches_canonical_key(mongo):
+    mongo._cursor.insert_one(
+        {"email": "John.Doe+a@gmail.com", "email_canonical": "johndoe@gmail.com"}
+    )
+
+    assert mongo.find("johndoe@gmail.com")
+    assert not mongo.find("jane@gmail.com")
+
+
+def test_mongo_find_falls_back_to_raw_email_before_backfill(mongo):
+    mongo._cursor.insert_one({"email": "John.Doe@gmail.com"})
+
+    assert mongo.find("John.Doe@gmail.com")
+
+
+def test_mongo_warmup_does_not_backfill(mongo):
+    mongo._cursor.insert_one({"email": "John.Doe@gmail.com"})
+
+    assert mongo.warmup()
+    assert "email_canonical" not in mongo._cursor.find_one({})